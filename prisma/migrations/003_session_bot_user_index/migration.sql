@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Session_botId_userId_idx" ON "Session"("botId", "userId");
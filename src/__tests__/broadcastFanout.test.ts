@@ -0,0 +1,217 @@
+import { describe, expect, it } from 'vitest';
+import {
+  BroadcastJob,
+  BroadcastJobData,
+  BroadcastSendQueue,
+  FanoutCheckpoint,
+  FanoutRecipient,
+  estimateFanoutProgress,
+  processBroadcastJob,
+  runBroadcastFanout
+} from '../jobs/broadcastFanout';
+
+const buildRecipients = (count: number): FanoutRecipient[] =>
+  Array.from({ length: count }, (_, index) => ({
+    id: String(index).padStart(8, '0'),
+    telegramId: String(100000 + index)
+  }));
+
+const pageFrom = (recipients: FanoutRecipient[]) => async (cursor: string | null, limit: number) => {
+  const start = cursor === null ? 0 : recipients.findIndex((recipient) => recipient.id > cursor);
+  return start === -1 ? [] : recipients.slice(start, start + limit);
+};
+
+const fakeJob = (data: BroadcastJobData) => {
+  const job: BroadcastJob & { progress: object[] } = {
+    data,
+    progress: [],
+    updateData: async (next) => {
+      job.data = next;
+    },
+    updateProgress: async (progress) => {
+      job.progress.push(progress);
+    }
+  };
+  return job;
+};
+
+const fakeSendQueue = () => {
+  const jobs: Array<{ name: string; data: { telegramId: string }; opts: { jobId: string } }> = [];
+  const queue: BroadcastSendQueue = {
+    addBulk: async (batch) => {
+      jobs.push(...batch);
+    }
+  };
+  return { queue, jobs };
+};
+
+describe('broadcast fan-out', () => {
+  it('enqueues every recipient in bounded bulk chunks', async () => {
+    const recipients = buildRecipients(25);
+    const chunks: string[][] = [];
+    const result = await runBroadcastFanout({
+      fetchPage: pageFrom(recipients),
+      enqueueBulk: async (ids) => chunks.push(ids),
+      saveCheckpoint: async () => undefined,
+      countRecipients: async () => recipients.length,
+      pageSize: 10,
+      bulkSize: 4
+    });
+
+    expect(result).toEqual({ cursor: '00000024', enqueued: 25, total: 25, done: true });
+    expect(Math.max(...chunks.map((chunk) => chunk.length))).toBe(4);
+    expect(chunks.flat()).toEqual(recipients.map((recipient) => recipient.telegramId));
+  });
+
+  it('resumes from the last checkpoint after a crash', async () => {
+    const recipients = buildRecipients(30);
+    const sent: string[] = [];
+    let saved: FanoutCheckpoint | null = null;
+    let pages = 0;
+
+    await expect(
+      runBroadcastFanout({
+        fetchPage: async (cursor, limit) => {
+          pages += 1;
+          if (pages === 3) {
+            throw new Error('worker crashed');
+          }
+          return pageFrom(recipients)(cursor, limit);
+        },
+        enqueueBulk: async (ids) => sent.push(...ids),
+        saveCheckpoint: async (checkpoint) => {
+          saved = checkpoint;
+        },
+        pageSize: 10
+      })
+    ).rejects.toThrow('worker crashed');
+
+    expect(saved).toMatchObject({ cursor: '00000019', enqueued: 20, done: false });
+
+    const result = await runBroadcastFanout({
+      checkpoint: saved,
+      fetchPage: pageFrom(recipients),
+      enqueueBulk: async (ids) => sent.push(...ids),
+      saveCheckpoint: async () => undefined,
+      pageSize: 10
+    });
+
+    expect(result.enqueued).toBe(30);
+    expect(sent).toEqual(recipients.map((recipient) => recipient.telegramId));
+  });
+
+  it('estimates rate and eta from the current run', () => {
+    const progress = estimateFanoutProgress({
+      enqueued: 600,
+      total: 1000,
+      enqueuedThisRun: 200,
+      elapsedMs: 2000,
+      cursor: 'abc'
+    });
+    expect(progress.ratePerSec).toBe(100);
+    expect(progress.etaMs).toBe(4000);
+    expect(estimateFanoutProgress({ ...progress, enqueuedThisRun: 0, elapsedMs: 0 }).etaMs).toBeNull();
+  });
+
+  describe('processBroadcastJob', () => {
+    const recipients = buildRecipients(12);
+    const source = {
+      countRecipients: async () => recipients.length,
+      fetchRecipients: (_botId: string, cursor: string | null, limit: number) =>
+        pageFrom(recipients)(cursor, limit)
+    };
+
+    it('enqueues send jobs with deterministic job ids and marks the notification sent', async () => {
+      const job = fakeJob({ botId: 'bot-1', message: 'hi', notificationId: 'n-1' });
+      const { queue, jobs } = fakeSendQueue();
+      const sent: string[] = [];
+
+      await processBroadcastJob(job, {
+        sendQueue: queue,
+        source,
+        markSent: async (id) => sent.push(id),
+        pageSize: 5
+      });
+
+      expect(jobs.map((entry) => entry.opts.jobId)).toEqual(
+        recipients.map((recipient) => `n-1-${recipient.telegramId}`)
+      );
+      expect(jobs[0]).toMatchObject({ name: 'send', data: { telegramId: '100000' } });
+      expect(job.data.checkpoint).toMatchObject({ enqueued: 12, done: true });
+      expect(job.progress.length).toBeGreaterThan(0);
+      expect(sent).toEqual(['n-1']);
+    });
+
+    it('writes the checkpoint to job data and resumes from it on retry', async () => {
+      const job = fakeJob({ botId: 'bot-1', message: 'hi', notificationId: 'n-2' });
+      const { queue, jobs } = fakeSendQueue();
+      let calls = 0;
+      const flaky = {
+        ...source,
+        fetchRecipients: async (botId: string, cursor: string | null, limit: number) => {
+          calls += 1;
+          if (calls === 2) {
+            throw new Error('worker crashed');
+          }
+          return source.fetchRecipients(botId, cursor, limit);
+        }
+      };
+
+      await expect(
+        processBroadcastJob(job, { sendQueue: queue, source: flaky, markSent: async () => undefined, pageSize: 5 })
+      ).rejects.toThrow('worker crashed');
+      expect(job.data.checkpoint).toMatchObject({ cursor: '00000004', enqueued: 5, done: false });
+
+      const cursors: Array<string | null> = [];
+      const retry = fakeJob(job.data);
+      await processBroadcastJob(retry, {
+        sendQueue: queue,
+        source: {
+          ...source,
+          fetchRecipients: async (botId, cursor, limit) => {
+            cursors.push(cursor);
+            return source.fetchRecipients(botId, cursor, limit);
+          }
+        },
+        markSent: async () => undefined,
+        pageSize: 5
+      });
+
+      expect(cursors[0]).toBe('00000004');
+      expect(jobs.map((entry) => entry.data.telegramId)).toEqual(
+        recipients.map((recipient) => recipient.telegramId)
+      );
+    });
+
+    it('skips straight to marking sent when the checkpoint is done', async () => {
+      const job = fakeJob({
+        botId: 'bot-1',
+        message: 'hi',
+        notificationId: 'n-3',
+        checkpoint: { cursor: '00000011', enqueued: 12, total: 12, done: true }
+      });
+      const { queue, jobs } = fakeSendQueue();
+      const sent: string[] = [];
+      let fetched = false;
+
+      await processBroadcastJob(job, {
+        sendQueue: queue,
+        source: {
+          countRecipients: async () => {
+            fetched = true;
+            return 0;
+          },
+          fetchRecipients: async () => {
+            fetched = true;
+            return [];
+          }
+        },
+        markSent: async (id) => sent.push(id)
+      });
+
+      expect(fetched).toBe(false);
+      expect(jobs).toEqual([]);
+      expect(sent).toEqual(['n-3']);
+    });
+  });
+});
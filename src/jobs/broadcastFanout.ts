@@ -0,0 +1,199 @@
+export interface FanoutRecipient {
+  id: string;
+  telegramId: string;
+}
+
+export interface FanoutCheckpoint {
+  cursor: string | null;
+  enqueued: number;
+  total: number | null;
+  done: boolean;
+}
+
+export interface FanoutProgress {
+  enqueued: number;
+  total: number | null;
+  ratePerSec: number;
+  etaMs: number | null;
+  cursor: string | null;
+}
+
+export interface FanoutOptions {
+  /**
+   * Returns up to `limit` recipients with `id > cursor`, ordered by `id` ascending.
+   * Recipients must be distinct across pages (keyset pagination over a unique key).
+   */
+  fetchPage: (cursor: string | null, limit: number) => Promise<FanoutRecipient[]>;
+  enqueueBulk: (telegramIds: string[]) => Promise<unknown>;
+  saveCheckpoint: (checkpoint: FanoutCheckpoint) => Promise<unknown>;
+  countRecipients?: () => Promise<number>;
+  onProgress?: (progress: FanoutProgress) => Promise<unknown> | void;
+  checkpoint?: FanoutCheckpoint | null;
+  pageSize?: number;
+  bulkSize?: number;
+  now?: () => number;
+}
+
+export const DEFAULT_FANOUT_PAGE_SIZE = 1000;
+export const DEFAULT_FANOUT_BULK_SIZE = 500;
+
+export const estimateFanoutProgress = ({
+  enqueued,
+  total,
+  enqueuedThisRun,
+  elapsedMs,
+  cursor
+}: {
+  enqueued: number;
+  total: number | null;
+  enqueuedThisRun: number;
+  elapsedMs: number;
+  cursor: string | null;
+}): FanoutProgress => {
+  const ratePerSec = elapsedMs > 0 ? (enqueuedThisRun * 1000) / elapsedMs : 0;
+  const remaining = total === null ? null : Math.max(total - enqueued, 0);
+  let etaMs: number | null = null;
+  if (remaining === 0) {
+    etaMs = 0;
+  } else if (remaining !== null && ratePerSec > 0) {
+    etaMs = Math.round((remaining / ratePerSec) * 1000);
+  }
+  return { enqueued, total, ratePerSec, etaMs, cursor };
+};
+
+/**
+ * Streams recipients page by page and enqueues them in bulk chunks.
+ * A checkpoint is saved after every page, so a retried run resumes from the last
+ * committed cursor; the current page may be enqueued twice, so `enqueueBulk`
+ * should be idempotent (e.g. deterministic job ids).
+ */
+export const runBroadcastFanout = async (options: FanoutOptions): Promise<FanoutCheckpoint> => {
+  const pageSize = options.pageSize ?? DEFAULT_FANOUT_PAGE_SIZE;
+  const bulkSize = options.bulkSize ?? DEFAULT_FANOUT_BULK_SIZE;
+  const now = options.now ?? Date.now;
+
+  const checkpoint: FanoutCheckpoint = options.checkpoint
+    ? { ...options.checkpoint }
+    : { cursor: null, enqueued: 0, total: null, done: false };
+
+  if (checkpoint.done) {
+    return checkpoint;
+  }
+
+  if (checkpoint.total === null && options.countRecipients) {
+    checkpoint.total = await options.countRecipients();
+  }
+
+  const startedAt = now();
+  const enqueuedAtStart = checkpoint.enqueued;
+
+  for (;;) {
+    const page = await options.fetchPage(checkpoint.cursor, pageSize);
+
+    for (let offset = 0; offset < page.length; offset += bulkSize) {
+      const chunk = page.slice(offset, offset + bulkSize).map((recipient) => recipient.telegramId);
+      await options.enqueueBulk(chunk);
+    }
+
+    if (page.length > 0) {
+      checkpoint.cursor = page[page.length - 1].id;
+      checkpoint.enqueued += page.length;
+    }
+    checkpoint.done = page.length < pageSize;
+    if (checkpoint.done && checkpoint.total !== null) {
+      checkpoint.total = checkpoint.enqueued;
+    }
+    await options.saveCheckpoint({ ...checkpoint });
+
+    if (options.onProgress) {
+      await options.onProgress(
+        estimateFanoutProgress({
+          enqueued: checkpoint.enqueued,
+          total: checkpoint.total,
+          enqueuedThisRun: checkpoint.enqueued - enqueuedAtStart,
+          elapsedMs: now() - startedAt,
+          cursor: checkpoint.cursor
+        })
+      );
+    }
+
+    if (checkpoint.done) {
+      return checkpoint;
+    }
+  }
+};
+
+export interface BroadcastJobData {
+  botId: string;
+  message: string;
+  notificationId: string;
+  checkpoint?: FanoutCheckpoint;
+}
+
+export interface BroadcastJob {
+  data: BroadcastJobData;
+  updateData: (data: BroadcastJobData) => Promise<unknown>;
+  updateProgress: (progress: object) => Promise<unknown>;
+}
+
+export interface BroadcastSendQueue {
+  addBulk: (
+    jobs: Array<{
+      name: string;
+      data: { botId: string; message: string; telegramId: string };
+      opts: { jobId: string };
+    }>
+  ) => Promise<unknown>;
+}
+
+export interface BroadcastRecipientSource {
+  countRecipients: (botId: string) => Promise<number>;
+  fetchRecipients: (botId: string, cursor: string | null, limit: number) => Promise<FanoutRecipient[]>;
+}
+
+export const broadcastSendJobId = (notificationId: string, telegramId: string) =>
+  `${notificationId}-${telegramId}`;
+
+/**
+ * Processes a `notification-batch` job. The checkpoint lives in `job.data`, so a
+ * retried job continues from it and a finished one only marks the notification sent.
+ */
+export const processBroadcastJob = async (
+  job: BroadcastJob,
+  {
+    sendQueue,
+    source,
+    markSent,
+    pageSize,
+    bulkSize
+  }: {
+    sendQueue: BroadcastSendQueue;
+    source: BroadcastRecipientSource;
+    markSent: (notificationId: string) => Promise<unknown>;
+    pageSize?: number;
+    bulkSize?: number;
+  }
+) => {
+  const { botId, message, notificationId, checkpoint } = job.data;
+
+  await runBroadcastFanout({
+    checkpoint,
+    pageSize,
+    bulkSize,
+    countRecipients: () => source.countRecipients(botId),
+    fetchPage: (cursor, limit) => source.fetchRecipients(botId, cursor, limit),
+    enqueueBulk: (telegramIds) =>
+      sendQueue.addBulk(
+        telegramIds.map((telegramId) => ({
+          name: 'send',
+          data: { botId, message, telegramId },
+          // Deterministic id so a resumed page is not sent twice.
+          opts: { jobId: broadcastSendJobId(notificationId, telegramId) }
+        }))
+      ),
+    saveCheckpoint: (next) => job.updateData({ ...job.data, checkpoint: next }),
+    onProgress: (progress) => job.updateProgress({ ...progress })
+  });
+
+  await markSent(notificationId);
+};
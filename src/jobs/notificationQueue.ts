@@ -5,6 +5,11 @@ import { sendMessage } from '../core/telegram';
 import { prisma } from '../core/prisma';
 import { NotificationStatus } from '@prisma/client';
 import { updateNotificationStatus } from '../services/notification.service';
+import {
+  BroadcastRecipientSource,
+  FanoutRecipient,
+  processBroadcastJob
+} from './broadcastFanout';
 
 const connection = { url: env.REDIS_URL };
 
@@ -24,6 +29,30 @@ export const notificationBatchQueue = new Queue('notification-batch', {
   }
 });
 
+// Keyset over the bot's own (botId, userId) index: each page reads only its own rows.
+// Prisma's `distinct` + `take` is not a real keyset, hence the raw SQL.
+const sessionRecipientSource: BroadcastRecipientSource = {
+  countRecipients: async (botId) => {
+    const [row] = await prisma.$queryRaw<Array<{ count: bigint }>>`
+      SELECT COUNT(DISTINCT "userId") AS count FROM "Session" WHERE "botId" = ${botId}
+    `;
+    return Number(row?.count ?? 0);
+  },
+  fetchRecipients: (botId, cursor, limit) =>
+    prisma.$queryRaw<FanoutRecipient[]>`
+      SELECT page."userId" AS id, u."telegramId" AS "telegramId"
+      FROM (
+        SELECT DISTINCT s."userId"
+        FROM "Session" s
+        WHERE s."botId" = ${botId} AND s."userId" > ${cursor ?? ''}
+        ORDER BY s."userId"
+        LIMIT ${limit}
+      ) page
+      JOIN "User" u ON u."id" = page."userId"
+      ORDER BY page."userId"
+    `
+};
+
 export const enqueueBroadcast = async ({
   botId,
   message,
@@ -62,32 +91,13 @@ export const enqueueDirectNotification = async ({
 export const startNotificationWorkers = () => {
   new Worker(
     'notification-batch',
-    async (job) => {
-      const { botId, message, notificationId } = job.data as {
-        botId: string;
-        message: string;
-        notificationId: string;
-      };
-
-      const sessions = await prisma.session.findMany({
-        where: { botId },
-        include: { user: true }
-      });
-
-      const recipients = Array.from(
-        new Set(sessions.map((session) => session.user.telegramId))
-      );
-
-      for (const telegramId of recipients) {
-        await notificationSendQueue.add('send', {
-          botId,
-          message,
-          telegramId
-        });
-      }
-
-      await updateNotificationStatus(notificationId, NotificationStatus.SENT);
-    },
+    async (job) =>
+      processBroadcastJob(job, {
+        sendQueue: notificationSendQueue,
+        source: sessionRecipientSource,
+        markSent: (notificationId) =>
+          updateNotificationStatus(notificationId, NotificationStatus.SENT)
+      }),
     { connection }
   );
 